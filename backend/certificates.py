@@ -2,92 +2,181 @@ import platform
 import subprocess
 import re
 import os
+import plistlib
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# The host OS cannot change while we run, so resolve it once
+_SYS = platform.system()
+_IS_DARWIN = _SYS == 'Darwin'
+_IS_LINUX = _SYS == 'Linux'
+
+# Seconds a probe command may run before it is abandoned
+PROBE_TIMEOUT = 5
+# Update checks query remote repositories and routinely take longer
+UPDATE_PROBE_TIMEOUT = 60
+
+def _run(cmd, timeout=PROBE_TIMEOUT, merge_stderr=False):
+    """Run a probe command and return its stdout as text.
+
+    Raises CalledProcessError on a non-zero exit and TimeoutExpired when the
+    command hangs; probes treat either as "could not evaluate".
+    """
+    return subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+        text=True,
+        timeout=timeout,
+        check=True,
+    ).stdout
+
+def ttl_cache(seconds):
+    """Cache a probe's result for `seconds`, for properties that change on the order of days"""
+    def decorator(fn):
+        cache = {}
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            hit = cache.get(args)
+            if hit is not None and now - hit[0] < seconds:
+                return hit[1]
+            value = fn(*args)
+            cache[args] = (now, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+def _read_plist(path, key):
+    """Read one key from a preferences plist without forking `defaults`"""
+    with open(path, 'rb') as f:
+        return plistlib.load(f)[key]
+
+# How long slow-moving probe results are reused across reports
+SLOW_PROBE_TTL = 300
+
+def _slurp(path, chunk_size=4096):
+    """Read a small text file with raw os.read calls, skipping buffered I/O"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks).decode()
+    finally:
+        os.close(fd)
+
+@ttl_cache(SLOW_PROBE_TTL)
 def check_disk_encryption():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['fdesetup', 'status']).decode()
+        if _IS_DARWIN:
+            out = _run(['fdesetup', 'status'])
             return 'On' in out or 'FileVault is On' in out
-        elif platform.system() == 'Linux':
+        elif _IS_LINUX:
             # Check for LUKS encrypted root
-            out = subprocess.check_output(['lsblk', '-o', 'NAME,TYPE,MOUNTPOINT']).decode()
+            out = _run(['lsblk', '-o', 'NAME,TYPE,MOUNTPOINT'])
             return any('crypt' in line for line in out.splitlines())
         else:
             return None
     except Exception:
         return None
 
+@ttl_cache(SLOW_PROBE_TTL)
 def check_os_updates():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['softwareupdate', '-l']).decode()
+        if _IS_DARWIN:
+            out = _run(['softwareupdate', '-l'], timeout=UPDATE_PROBE_TIMEOUT)
             return 'No new software available' in out
-        elif platform.system() == 'Linux':
+        elif _IS_LINUX:
             # Try apt
             try:
-                out = subprocess.check_output(['apt', 'list', '--upgradable']).decode()
-                return len([l for l in out.splitlines() if '/' in l and 'upgradable' in l]) == 0
+                out = _run(['apt', 'list', '--upgradable'])
+                return not any('/' in l and 'upgradable' in l for l in out.split('\n'))
             except Exception:
                 # Try yum
-                out = subprocess.check_output(['yum', 'check-update']).decode()
+                out = _run(['yum', 'check-update'], timeout=UPDATE_PROBE_TIMEOUT)
                 return out.strip() == ''
         else:
             return None
     except Exception:
         return None
 
+@ttl_cache(SLOW_PROBE_TTL)
 def check_access_control():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['dscl', '.', '-read', '/Groups/admin', 'GroupMembership']).decode()
+        if _IS_DARWIN:
+            out = _run(['dscl', '.', '-read', '/Groups/admin', 'GroupMembership'])
             users = out.split(':')[-1].strip().split()
             return len(users) <= 2  # root + 1 admin
-        elif platform.system() == 'Linux':
-            out = subprocess.check_output(['getent', 'group', 'sudo']).decode()
-            users = out.split(':')[-1].strip().split(',')
+        elif _IS_LINUX:
+            import grp
+            # Read the group database in-process instead of forking getent
+            users = grp.getgrnam('sudo').gr_mem
             return len([u for u in users if u]) <= 2
         else:
             return None
     except Exception:
         return None
 
+_UFW_ENABLED = re.compile(r'^\s*ENABLED\s*=\s*yes\b', re.MULTILINE | re.IGNORECASE)
+
 def check_firewall():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['/usr/libexec/ApplicationFirewall/socketfilterfw', '--getglobalstate']).decode()
-            return 'enabled' in out.lower()
-        elif platform.system() == 'Linux':
-            out = subprocess.check_output(['ufw', 'status']).decode()
-            return 'active' in out.lower()
+        if _IS_DARWIN:
+            try:
+                return _read_plist('/Library/Preferences/com.apple.alf.plist', 'globalstate') > 0
+            except (OSError, KeyError, plistlib.InvalidFileException):
+                out = _run(['/usr/libexec/ApplicationFirewall/socketfilterfw', '--getglobalstate'])
+                return 'enabled' in out.lower()
+        elif _IS_LINUX:
+            try:
+                return _UFW_ENABLED.search(_slurp('/etc/ufw/ufw.conf')) is not None
+            except OSError:
+                out = _run(['ufw', 'status'])
+                return 'status: active' in out.lower()
         else:
             return None
     except Exception:
         return None
 
+@ttl_cache(SLOW_PROBE_TTL)
 def check_auto_updates():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['defaults', 'read', '/Library/Preferences/com.apple.SoftwareUpdate', 'AutomaticCheckEnabled']).decode().strip()
-            return out == '1'
-        elif platform.system() == 'Linux':
-            out = subprocess.check_output(['systemctl', 'is-enabled', 'unattended-upgrades']).decode().strip()
+        if _IS_DARWIN:
+            try:
+                return bool(_read_plist('/Library/Preferences/com.apple.SoftwareUpdate.plist', 'AutomaticCheckEnabled'))
+            except (OSError, KeyError, plistlib.InvalidFileException):
+                out = _run(['defaults', 'read', '/Library/Preferences/com.apple.SoftwareUpdate', 'AutomaticCheckEnabled']).strip()
+                return out == '1'
+        elif _IS_LINUX:
+            out = _run(['systemctl', 'is-enabled', 'unattended-upgrades']).strip()
             return out == 'enabled'
         else:
             return None
     except Exception:
         return None
 
+_MINLEN_DARWIN = re.compile(r'minLength\s*=\s*"?(\d+)"?')
+_MINLEN_LINUX = re.compile(r'PASS_MIN_LEN\s+(\d+)')
+
+@ttl_cache(SLOW_PROBE_TTL)
 def check_password_policy():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['pwpolicy', 'getaccountpolicies'], stderr=subprocess.STDOUT).decode()
-            minlen = re.search(r'minLength\s*=\s*"?(\d+)"?', out)
+        if _IS_DARWIN:
+            out = _run(['pwpolicy', 'getaccountpolicies'], merge_stderr=True)
+            minlen = _MINLEN_DARWIN.search(out)
             minlen = int(minlen.group(1)) if minlen else 0
             return minlen >= 8
-        elif platform.system() == 'Linux':
-            with open('/etc/login.defs') as f:
-                content = f.read()
-            minlen = re.search(r'PASS_MIN_LEN\s+(\d+)', content)
+        elif _IS_LINUX:
+            content = _slurp('/etc/login.defs')
+            minlen = _MINLEN_LINUX.search(content)
             minlen = int(minlen.group(1)) if minlen else 0
             return minlen >= 8
         else:
@@ -95,155 +184,297 @@ def check_password_policy():
     except Exception:
         return None
 
+def _systemctl_active(units):
+    """Query several units with one `systemctl is-active` call.
+
+    systemctl prints one state per unit in argument order and exits non-zero
+    when any unit is inactive, so the exit status is ignored. Units without a
+    state line (e.g. no systemd) are left out of the returned dict.
+    """
+    proc = subprocess.run(['systemctl', 'is-active', *units], capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    return {unit: state.strip() == 'active' for unit, state in zip(units, proc.stdout.splitlines())}
+
 def check_logging():
     try:
-        if platform.system() == 'Linux':
-            out = subprocess.check_output(['systemctl', 'is-active', 'rsyslog']).decode().strip()
-            return out == 'active'
-        elif platform.system() == 'Darwin':
+        if _IS_LINUX:
+            return _systemctl_active(('rsyslog',)).get('rsyslog')
+        elif _IS_DARWIN:
             # macOS uses syslogd
-            out = subprocess.check_output(['pgrep', 'syslogd']).decode().strip()
+            out = _run(['pgrep', 'syslogd']).strip()
             return bool(out)
         else:
             return None
     except Exception:
         return None
 
+def _format_uptime(seconds):
+    """Format seconds the way procps-ng `uptime -p` does, e.g. 'up 1 week, 2 days, 3 hours'.
+
+    Units are reduced independently like procps-ng does, so a year is 365
+    days while weeks wrap at 52.
+    """
+    seconds = int(seconds)
+    years = seconds // (365 * 24 * 3600)
+    weeks = seconds // (7 * 24 * 3600) % 52
+    days = seconds // (24 * 3600) % 7
+    hours = seconds // 3600 % 24
+    minutes = seconds // 60 % 60
+    parts = [f"{value} {unit}{'' if value == 1 else 's'}"
+             for value, unit in ((years, 'year'), (weeks, 'week'), (days, 'day'),
+                                 (hours, 'hour'), (minutes, 'minute')) if value]
+    return 'up ' + (', '.join(parts) or '0 minutes')
+
 def check_uptime():
     try:
-        out = subprocess.check_output(['uptime', '-p']).decode().strip()
+        if _IS_LINUX:
+            return _format_uptime(float(_slurp('/proc/uptime').split()[0]))
+        out = _run(['uptime', '-p']).strip()
         return out
     except Exception:
         return None
 
 def check_auditd():
     try:
-        if platform.system() == 'Linux':
-            out = subprocess.check_output(['systemctl', 'is-active', 'auditd']).decode().strip()
-            return out == 'active'
-        elif platform.system() == 'Darwin':
+        if _IS_LINUX:
+            return _systemctl_active(('auditd',)).get('auditd')
+        elif _IS_DARWIN:
             # macOS auditd is always running
-            out = subprocess.check_output(['pgrep', 'auditd']).decode().strip()
+            out = _run(['pgrep', 'auditd']).strip()
             return bool(out)
         else:
             return None
     except Exception:
         return None
 
+AV_PROCESSES = frozenset(['clamd', 'avast', 'sophos', 'mcafee', 'symantec', 'bitdefender'])
+
+def _linux_process_names():
+    """Yield process names straight from /proc instead of forking ps"""
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/comm') as f:
+                yield f.read().strip().lower()
+        except OSError:
+            # Process exited between listdir and open
+            continue
+
 def check_antivirus():
     try:
-        out = subprocess.check_output(['ps', 'aux']).decode()
-        return any(av in out for av in ['clamd', 'avast', 'sophos', 'mcafee', 'symantec', 'bitdefender'])
+        if _IS_LINUX:
+            try:
+                return any(av in name for name in _linux_process_names() for av in AV_PROCESSES)
+            except OSError:
+                pass  # /proc unavailable, fall back to ps
+        elif _IS_DARWIN:
+            out = _run(['launchctl', 'list']).lower()
+            return any(av in out for av in AV_PROCESSES)
+        out = _run(['ps', 'aux'])
+        return any(av in out for av in AV_PROCESSES)
     except Exception:
         return None
 
 def check_screen_lock():
     try:
-        if platform.system() == 'Darwin':
-            out = subprocess.check_output(['defaults', 'read', 'com.apple.screensaver', 'askForPassword']).decode().strip()
-            return out == '1'
-        elif platform.system() == 'Linux':
+        if _IS_DARWIN:
+            try:
+                return bool(_read_plist(os.path.expanduser('~/Library/Preferences/com.apple.screensaver.plist'), 'askForPassword'))
+            except (OSError, KeyError, plistlib.InvalidFileException):
+                out = _run(['defaults', 'read', 'com.apple.screensaver', 'askForPassword']).strip()
+                return out == '1'
+        elif _IS_LINUX:
             # Try gsettings for GNOME
-            out = subprocess.check_output(['gsettings', 'get', 'org.gnome.desktop.screensaver', 'lock-enabled']).decode().strip()
+            out = _run(['gsettings', 'get', 'org.gnome.desktop.screensaver', 'lock-enabled']).strip()
             return out == 'true'
         else:
             return None
     except Exception:
         return None
 
+@ttl_cache(SLOW_PROBE_TTL)
 def check_fips_mode():
     try:
-        if os.path.exists('/proc/sys/crypto/fips_enabled'):
-            with open('/proc/sys/crypto/fips_enabled') as f:
-                return f.read().strip() == '1'
-        elif platform.system() == 'Linux':
-            out = subprocess.check_output(['sysctl', 'crypto.fips_enabled']).decode()
+        try:
+            return _slurp('/proc/sys/crypto/fips_enabled').strip() == '1'
+        except FileNotFoundError:
+            pass
+        if _IS_LINUX:
+            out = _run(['sysctl', 'crypto.fips_enabled'])
             return '1' in out
         else:
             return None
     except Exception:
         return None
 
+HOME_DIR_LIMIT = 10 * 2**30  # 10G
+# Bound the walk like a probe command, so huge trees cannot stall a report
+HOME_DIR_SCAN_TIMEOUT = PROBE_TIMEOUT
+
+def _dir_size_exceeds(path, limit, deadline):
+    """Sum file sizes under path, stopping as soon as limit is passed.
+
+    Raises TimeoutError once time.monotonic() passes deadline.
+    """
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"scanning {path} took too long")
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                        if total > limit:
+                            return True
+        except TimeoutError:
+            # A subclass of OSError, but this one must reach the probe
+            raise
+        except OSError:
+            # Unreadable or vanished directory, skip it like du does
+            continue
+    return False
+
+@ttl_cache(SLOW_PROBE_TTL)
 def check_large_home_dirs():
     try:
-        out = subprocess.check_output(['du', '-sh', '/home/*']).decode()
         # If any home dir > 10G, flag as not minimized
-        for line in out.splitlines():
-            size = line.split()[0]
-            if size.endswith('G') and float(size[:-1]) > 10:
-                return False
+        deadline = time.monotonic() + HOME_DIR_SCAN_TIMEOUT
+        with os.scandir('/home') as homes:
+            for home in homes:
+                if home.is_dir(follow_symlinks=False) and _dir_size_exceeds(home.path, HOME_DIR_LIMIT, deadline):
+                    return False
         return True
     except Exception:
         return None
 
-def check_cis_benchmarks(report_data):
-    results = {}
-    results['password_min_length'] = check_password_policy()
-    results['firewall_enabled'] = check_firewall()
-    results['auto_updates_enabled'] = check_auto_updates()
-    return results
-
-def check_iso27001(report_data):
-    results = {}
-    results['disk_encryption'] = check_disk_encryption()
-    results['os_updates'] = check_os_updates()
-    results['access_control'] = check_access_control()
-    return results
-
-def check_soc2(report_data):
-    results = {}
-    results['logging_enabled'] = check_logging()
-    results['availability'] = check_uptime()
-    return results
-
-def check_hipaa(report_data):
-    results = {}
-    results['disk_encryption'] = check_disk_encryption()
-    results['audit_logs'] = check_auditd()
-    return results
-
-def check_pci_dss(report_data):
-    results = {}
-    results['disk_encryption'] = check_disk_encryption()
-    results['firewall_enabled'] = check_firewall()
-    results['antivirus_installed'] = check_antivirus()
-    return results
-
-def check_nist_800_53(report_data):
-    results = {}
-    results['os_updates'] = check_os_updates()
-    results['access_control'] = check_access_control()
-    results['screen_lock'] = check_screen_lock()
-    return results
-
-def check_gdpr(report_data):
-    results = {}
-    results['disk_encryption'] = check_disk_encryption()
-    results['data_minimization'] = check_large_home_dirs()
-    return results
-
-def check_fedramp(report_data):
-    results = {}
-    results['disk_encryption'] = check_disk_encryption()
-    results['os_updates'] = check_os_updates()
-    results['fips_mode'] = check_fips_mode()
-    return results
-
-def check_certificate(cert_id, report_data):
-    if cert_id == 'cis':
-        return check_cis_benchmarks(report_data)
-    if cert_id == 'iso27001':
-        return check_iso27001(report_data)
-    if cert_id == 'soc2':
-        return check_soc2(report_data)
-    if cert_id == 'hipaa':
-        return check_hipaa(report_data)
-    if cert_id == 'pci':
-        return check_pci_dss(report_data)
-    if cert_id == 'nist':
-        return check_nist_800_53(report_data)
-    if cert_id == 'gdpr':
-        return check_gdpr(report_data)
-    if cert_id == 'fedramp':
-        return check_fedramp(report_data)
-    return {}
\ No newline at end of file
+# Result key -> probe for each supported certificate
+CERTIFICATE_PROBES = {
+    'cis': {
+        'password_min_length': check_password_policy,
+        'firewall_enabled': check_firewall,
+        'auto_updates_enabled': check_auto_updates,
+    },
+    'iso27001': {
+        'disk_encryption': check_disk_encryption,
+        'os_updates': check_os_updates,
+        'access_control': check_access_control,
+    },
+    'soc2': {
+        'logging_enabled': check_logging,
+        'availability': check_uptime,
+    },
+    'hipaa': {
+        'disk_encryption': check_disk_encryption,
+        'audit_logs': check_auditd,
+    },
+    'pci': {
+        'disk_encryption': check_disk_encryption,
+        'firewall_enabled': check_firewall,
+        'antivirus_installed': check_antivirus,
+    },
+    'nist': {
+        'os_updates': check_os_updates,
+        'access_control': check_access_control,
+        'screen_lock': check_screen_lock,
+    },
+    'gdpr': {
+        'disk_encryption': check_disk_encryption,
+        'data_minimization': check_large_home_dirs,
+    },
+    'fedramp': {
+        'disk_encryption': check_disk_encryption,
+        'os_updates': check_os_updates,
+        'fips_mode': check_fips_mode,
+    },
+}
+
+# Linux probes answered by a single `systemctl is-active <unit>` lookup
+_SYSTEMCTL_PROBES = {
+    check_logging: 'rsyslog',
+    check_auditd: 'auditd',
+}
+
+# Probes block on subprocesses, so threads overlap them without fighting the GIL
+_PROBE_POOL = ThreadPoolExecutor(max_workers=min((os.cpu_count() or 1) * 2, 16))
+
+def run_probes(probes, cache=None):
+    """Run each probe missing from cache once on the shared pool.
+
+    Results are stored in cache (a per-report dict keyed by probe), which is
+    returned so callers can share it across certificate evaluations.
+    """
+    cache = {} if cache is None else cache
+    pending = {probe for probe in probes if probe not in cache}
+    futures = {}
+    # Fold the systemctl probes into one invocation when more than one is needed
+    batched = [probe for probe in pending if probe in _SYSTEMCTL_PROBES] if _IS_LINUX else []
+    if len(batched) > 1:
+        pending.difference_update(batched)
+        units = tuple(_SYSTEMCTL_PROBES[probe] for probe in batched)
+        futures[_PROBE_POOL.submit(_systemctl_active, units)] = tuple(batched)
+    for probe in pending:
+        futures[_PROBE_POOL.submit(probe)] = probe
+    for future in as_completed(futures):
+        probe = futures[future]
+        if isinstance(probe, tuple):
+            try:
+                states = future.result()
+            except Exception:
+                states = {}
+            for batched_probe in probe:
+                cache[batched_probe] = states.get(_SYSTEMCTL_PROBES[batched_probe])
+        else:
+            cache[probe] = future.result()
+    return cache
+
+def required_probes(cert_ids):
+    """Return the deduplicated set of probes needed to evaluate cert_ids"""
+    return frozenset(
+        probe for cert_id in cert_ids for probe in CERTIFICATE_PROBES.get(cert_id, {}).values()
+    )
+
+def compile_certificate(cert_id):
+    """Build an evaluator that turns a filled probe cache into cert_id's results"""
+    checks = CERTIFICATE_PROBES.get(cert_id, {})
+    keys = tuple(checks)
+    probes = tuple(checks.values())
+
+    def evaluate(cache):
+        return dict(zip(keys, map(cache.__getitem__, probes)))
+    return evaluate
+
+def check_certificates(cert_ids, report_data, cache=None):
+    """Evaluate several certificates, launching each shared probe only once"""
+    results = run_probes(required_probes(cert_ids), cache)
+    return {cert_id: compile_certificate(cert_id)(results) for cert_id in cert_ids}
+
+def check_cis_benchmarks(report_data, cache=None):
+    return check_certificate('cis', report_data, cache)
+
+def check_iso27001(report_data, cache=None):
+    return check_certificate('iso27001', report_data, cache)
+
+def check_soc2(report_data, cache=None):
+    return check_certificate('soc2', report_data, cache)
+
+def check_hipaa(report_data, cache=None):
+    return check_certificate('hipaa', report_data, cache)
+
+def check_pci_dss(report_data, cache=None):
+    return check_certificate('pci', report_data, cache)
+
+def check_nist_800_53(report_data, cache=None):
+    return check_certificate('nist', report_data, cache)
+
+def check_gdpr(report_data, cache=None):
+    return check_certificate('gdpr', report_data, cache)
+
+def check_fedramp(report_data, cache=None):
+    return check_certificate('fedramp', report_data, cache)
+
+def check_certificate(cert_id, report_data, cache=None):
+    return check_certificates([cert_id], report_data, cache)[cert_id]
@@ -1,23 +1,58 @@
 import sqlite3
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from datetime import datetime
 import os
+import threading
+import time
+
+from certificates import required_probes, compile_certificate
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
 logger = logging.getLogger(__name__)
 
+# Other worker processes cannot invalidate our cache, so bound how stale it gets
+IMPOSED_CACHE_TTL = 5  # seconds
+
+# WAL keeps its -wal/-shm files next to the database, so in containers point
+# this into a mounted directory rather than bind-mounting the file alone
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "reports.db")
+
+# Kept as one constant so sqlite3's per-connection statement cache (keyed on
+# the SQL text) reuses the prepared statement across calls
+DEVICES_QUERY = """
+    SELECT device_id, hostname, first_seen, last_seen, total_reports
+    FROM devices
+    ORDER BY last_seen DESC
+"""
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "reports.db"):
+    def __init__(self, db_path: str = DATABASE_PATH):
         self.db_path = db_path
+        self._local = threading.local()
+        # (cached_at, imposed cert_ids, certificate plan) replaced as one tuple so
+        # readers never see the list and plan from different refreshes. The plan
+        # is (required probes, cert_id -> compiled evaluator).
+        self._imposed_cache: Optional[Tuple[float, List[str], Tuple[frozenset, Dict[str, Callable]]]] = None
         self.init_database()
     
     def get_connection(self):
-        """Get a database connection with proper timeout handling"""
+        """Get this thread's database connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork must not be reused by the child
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
         try:
             conn = sqlite3.connect(self.db_path, timeout=10)
             conn.row_factory = sqlite3.Row  # Enable dict-like access
+            # Per-connection tuning; WAL makes NORMAL sync crash-safe
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA cache_size=-65536")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
             return conn
         except sqlite3.Error as e:
             logger.error(f"Database connection error: {e}")
@@ -29,6 +64,9 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
+                # WAL lets readers proceed while a report is being written
+                cursor.execute("PRAGMA journal_mode=WAL")
+                
                 # Create compliance_reports table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS compliance_reports (
@@ -56,6 +94,27 @@ class DatabaseManager:
                         total_reports INTEGER DEFAULT 0
                     )
                 ''')
+                # Indices for the history, recent reports and device listing queries
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_reports_device_ts
+                    ON compliance_reports (device_id, timestamp DESC)
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_reports_ts
+                    ON compliance_reports (timestamp DESC)
+                ''')
+                # Covers every column DEVICES_QUERY reads, so listing devices
+                # is an index-only scan (SQLite has no INCLUDE clause)
+                cursor.execute('DROP INDEX IF EXISTS idx_devices_last_seen')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_devices_listing
+                    ON devices (last_seen DESC, device_id, hostname, first_seen, total_reports)
+                ''')
+                # Serves the recent non-compliant lookup in get_compliance_summary
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_reports_compliant_ts
+                    ON compliance_reports (is_compliant, timestamp DESC)
+                ''')
                 # Create imposed_certificates table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS imposed_certificates (
@@ -73,46 +132,60 @@ class DatabaseManager:
     
     def insert_compliance_report(self, report_data: Dict[str, Any]) -> bool:
         """Insert a new compliance report"""
+        return self.insert_compliance_reports([report_data])
+    
+    def insert_compliance_reports(self, reports: List[Dict[str, Any]]) -> bool:
+        """Insert a batch of compliance reports in a single transaction"""
+        if not reports:
+            return True
         try:
+            now = datetime.now().isoformat()
             with self.get_connection() as conn:
+                # Take the write lock up front so the whole batch commits at once
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
                 cursor = conn.cursor()
                 
-                # Insert or update device record
-                cursor.execute('''
-                    INSERT OR REPLACE INTO devices (device_id, hostname, last_seen, total_reports)
-                    VALUES (?, ?, ?, COALESCE(
-                        (SELECT total_reports FROM devices WHERE device_id = ?) + 1, 1
-                    ))
-                ''', (
-                    report_data['device_id'],
-                    report_data['hostname'],
-                    datetime.now().isoformat(),
-                    report_data['device_id']
-                ))
+                # Insert or update device records
+                cursor.executemany('''
+                    INSERT INTO devices (device_id, hostname, last_seen, total_reports)
+                    VALUES (?, ?, ?, 1)
+                    ON CONFLICT(device_id) DO UPDATE SET
+                        hostname = excluded.hostname,
+                        last_seen = excluded.last_seen,
+                        total_reports = devices.total_reports + 1
+                ''', [
+                    (report_data['device_id'], report_data['hostname'], now)
+                    for report_data in reports
+                ])
                 
-                # Insert compliance report
-                cursor.execute('''
+                # Insert compliance reports
+                cursor.executemany('''
                     INSERT INTO compliance_reports 
                     (device_id, hostname, disk_encryption_status, os_updates_status, 
                      running_processes, compliance_score, is_compliant, details)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    report_data['device_id'],
-                    report_data['hostname'],
-                    report_data.get('disk_encryption_status', 'Unknown'),
-                    report_data.get('os_updates_status', 'Unknown'),
-                    report_data.get('running_processes', ''),
-                    report_data.get('compliance_score', 0.0),
-                    report_data.get('is_compliant', False),
-                    report_data.get('details', '')
-                ))
+                ''', [
+                    (
+                        report_data['device_id'],
+                        report_data['hostname'],
+                        report_data.get('disk_encryption_status', 'Unknown'),
+                        report_data.get('os_updates_status', 'Unknown'),
+                        report_data.get('running_processes', ''),
+                        report_data.get('compliance_score', 0.0),
+                        report_data.get('is_compliant', False),
+                        report_data.get('details', '')
+                    )
+                    for report_data in reports
+                ])
                 
                 conn.commit()
-                logger.info(f"Compliance report inserted for device {report_data['device_id']}")
+                for report_data in reports:
+                    logger.debug("Compliance report inserted for device %s", report_data['device_id'])
                 return True
                 
         except sqlite3.Error as e:
-            logger.error(f"Error inserting compliance report: {e}")
+            logger.error(f"Error inserting compliance reports: {e}")
             return False
     
     def get_compliance_summary(self) -> Dict[str, Any]:
@@ -121,17 +194,15 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Get total devices
-                cursor.execute("SELECT COUNT(DISTINCT device_id) as total_devices FROM compliance_reports")
-                total_devices = cursor.fetchone()['total_devices']
-                
-                # Get compliant devices
+                # Get total and compliant devices in a single scan
                 cursor.execute("""
-                    SELECT COUNT(DISTINCT device_id) as compliant_devices 
-                    FROM compliance_reports 
-                    WHERE is_compliant = 1
+                    SELECT COUNT(DISTINCT device_id) as total_devices,
+                           COUNT(DISTINCT CASE WHEN is_compliant = 1 THEN device_id END) as compliant_devices
+                    FROM compliance_reports
                 """)
-                compliant_devices = cursor.fetchone()['compliant_devices']
+                row = cursor.fetchone()
+                total_devices = row['total_devices']
+                compliant_devices = row['compliant_devices']
                 
                 # Calculate compliance rate
                 compliance_rate = (compliant_devices / total_devices * 100) if total_devices > 0 else 0
@@ -192,6 +263,18 @@ class DatabaseManager:
             logger.error(f"Error getting recent reports: {e}")
             return []
 
+    def get_all_devices(self) -> List[Dict[str, Any]]:
+        """Get all known devices, most recently seen first"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(DEVICES_QUERY)
+                # Build dicts straight off the cursor instead of via fetchall()
+                return [dict(row) for row in cursor]
+        except sqlite3.Error as e:
+            logger.error(f"Error getting devices: {e}")
+            return []
+
     def impose_certificate(self, cert_id: str) -> bool:
         """Impose a compliance certificate (add if not already imposed)"""
         try:
@@ -202,21 +285,64 @@ class DatabaseManager:
                     VALUES (?, ?)
                 ''', (cert_id, datetime.now().isoformat()))
                 conn.commit()
+                self._invalidate_imposed_cache()
                 return True
         except Exception as e:
             logger.error(f"Error imposing certificate: {e}")
             return False
 
-    def get_imposed_certificates(self) -> list:
-        """Get all currently imposed certificates"""
+    def unimpose_certificate(self, cert_id: str) -> bool:
+        """Remove an imposed compliance certificate"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT cert_id FROM imposed_certificates')
-                return [row['cert_id'] for row in cursor.fetchall()]
+                cursor.execute('DELETE FROM imposed_certificates WHERE cert_id = ?', (cert_id,))
+                conn.commit()
+                self._invalidate_imposed_cache()
+                return True
+        except Exception as e:
+            logger.error(f"Error unimposing certificate: {e}")
+            return False
+
+    def _invalidate_imposed_cache(self):
+        """Drop the cached imposed certificates and their certificate plan"""
+        self._imposed_cache = None
+
+    def _load_imposed_certificates(self) -> Tuple[List[str], Tuple[frozenset, Dict[str, Callable]]]:
+        """Return the imposed certificates and their plan, refreshing them when stale"""
+        cached = self._imposed_cache
+        if cached is not None and time.monotonic() - cached[0] < IMPOSED_CACHE_TTL:
+            return cached[1], cached[2]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT cert_id FROM imposed_certificates')
+            imposed = [row['cert_id'] for row in cursor.fetchall()]
+        plan = (
+            required_probes(imposed),
+            {cert_id: compile_certificate(cert_id) for cert_id in imposed}
+        )
+        self._imposed_cache = (time.monotonic(), imposed, plan)
+        return imposed, plan
+
+    def get_imposed_certificates(self) -> list:
+        """Get all currently imposed certificates"""
+        try:
+            return list(self._load_imposed_certificates()[0])
         except Exception as e:
             logger.error(f"Error fetching imposed certificates: {e}")
             return []
 
+    def get_certificate_plan(self) -> Tuple[frozenset, Dict[str, Callable]]:
+        """Get the probes and compiled evaluators for the imposed certificates.
+
+        Raises if the imposed certificates cannot be read, rather than
+        evaluating reports against no certificates.
+        """
+        return self._load_imposed_certificates()[1]
+
+    def get_required_probes(self) -> frozenset:
+        """Get the deduplicated probes needed by the imposed certificates"""
+        return self.get_certificate_plan()[0]
+
 # Global database instance
 db_manager = DatabaseManager() 
\ No newline at end of file
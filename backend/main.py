@@ -1,23 +1,40 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
+import asyncio
+import base64
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 import uuid
 import secrets
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import jwt
+from jwt import InvalidTokenError as JWTError
+import redis.asyncio as aioredis
+import orjson
 
-# from db import db_manager
-# from certificates import check_certificate
+from db import db_manager
+from certificates import run_probes
+from passwords import pwd_context, verify_password
+from serve import configured_workers
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
 logger = logging.getLogger(__name__)
 
 # Authentication configuration
@@ -26,51 +43,158 @@ ALGORITHM = "HS256"  # Using HMAC-SHA256 (secure algorithm)
 ACCESS_TOKEN_EXPIRE_MINUTES = 15  # Reduced to 15 minutes for better security
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-# Password hashing with stronger settings
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12  # Increased rounds for better security
-)
-
 # Security
 security = HTTPBearer(auto_error=True)
 
 # Default admin credentials (should be changed in production)
 DEFAULT_ADMIN_USERNAME = "admin"
 DEFAULT_ADMIN_PASSWORD = "CarboncompliancEdev//v1"
+# Hash once at startup (or take a pre-hashed value) instead of on every login
+ADMIN_PASSWORD_HASH = os.environ.get("ADMIN_PASSWORD_HASH") or pwd_context.hash(DEFAULT_ADMIN_PASSWORD)
+
+# Sessions, revoked tokens and login attempts are kept in Redis when REDIS_URL
+# is set, so every worker process sees the same auth state. Without it they
+# fall back to the in-process stores below (single worker only).
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = aioredis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+
+# Uvicorn worker processes, as chosen by serve.py
+WORKERS = configured_workers()
+
+def create_bcrypt_pool() -> ProcessPoolExecutor:
+    """Pool for verifying passwords off the event loop, sharing the CPUs between workers.
+
+    bcrypt is CPU-bound, and spawn avoids forking a process that already
+    runs the report writer threads.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max(1, (os.cpu_count() or 1) // WORKERS),
+        mp_context=multiprocessing.get_context("spawn")
+    )
 
-# Store for active sessions and blacklisted tokens (in production, use Redis)
-active_sessions = {}
-blacklisted_tokens = set()
+bcrypt_pool = create_bcrypt_pool()
 
-# Rate limiting for login attempts
-login_attempts = {}
+# Store for active sessions and blacklisted tokens
+active_sessions = {}
+# username -> session ids, so logout only touches that user's sessions
+user_sessions = defaultdict(set)
+# Revoked tokens by digest -> exp; an entry is only needed until the token expires
+blacklisted_tokens = {}
+
+# Validated access tokens, keyed by token digest: digest -> (cached_until, User)
+token_cache = {}
+TOKEN_CACHE_TTL = 60  # seconds
+TOKEN_CACHE_MAX_SIZE = 10000
+
+# Rate limiting for login attempts: a token bucket per username holding up to
+# MAX_LOGIN_ATTEMPTS, refilled completely over LOCKOUT_DURATION. Each failed
+# login spends one token; username -> (tokens, last_refill_ts)
+login_buckets = {}
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION = 300  # 5 minutes
+LOGIN_REFILL_RATE = MAX_LOGIN_ATTEMPTS / LOCKOUT_DURATION  # tokens per second
+LOGIN_REFILL_INTERVAL = LOCKOUT_DURATION // MAX_LOGIN_ATTEMPTS  # seconds per regained attempt
+LOGIN_BUCKETS_MAX_SIZE = 10000
+
+# Spend one token from a Redis-held bucket atomically; full buckets are deleted
+SPEND_LOGIN_TOKEN_LUA = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.max(0, math.min(capacity, tokens + (now - ts) * rate) - 1)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return tostring(tokens)
+"""
+spend_login_token = redis_client.register_script(SPEND_LOGIN_TOKEN_LUA) if redis_client is not None else None
+
+# Reports are queued and written in batches so a burst shares one transaction
+REPORT_BATCH_SIZE = 100
+REPORT_BATCH_INTERVAL = 0.05  # seconds
+REPORT_WRITE_TIMEOUT = 30  # seconds a request waits for its batch to commit
+report_queue = queue.Queue()
+report_writer_thread = None
+report_writer_lock = threading.Lock()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Endpoint Compliance Monitor API",
     description="API for monitoring endpoint compliance status",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware for dashboard integration
+# Add CORS middleware for dashboard integration. Exact origins are required
+# with credentials; DASHBOARD_ORIGIN takes a comma-separated list.
+DEFAULT_DASHBOARD_ORIGIN = "http://localhost,http://127.0.0.1"
+if "DASHBOARD_ORIGIN" not in os.environ:
+    logger.warning(f"DASHBOARD_ORIGIN is not set; only {DEFAULT_DASHBOARD_ORIGIN} may call the API cross-origin")
+DASHBOARD_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get("DASHBOARD_ORIGIN", DEFAULT_DASHBOARD_ORIGIN).split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for production flexibility
+    allow_origins=DASHBOARD_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
+# List endpoints return large arrays of near-identical records; small bodies
+# are not worth the compression overhead
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Frontend pages are resolved once at import instead of stat'ed on every request
+FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
+LOGIN_PAGE = FRONTEND_DIR / "login.html"
+DASHBOARD_PAGE = FRONTEND_DIR / "index.html"
+DOWNLOAD_PAGE = FRONTEND_DIR / "download.html"
+AVAILABLE_PAGES = {page for page in (LOGIN_PAGE, DASHBOARD_PAGE, DOWNLOAD_PAGE) if page.is_file()}
+
 # Mount static files for the HTML dashboard
 try:
-    app.mount("/static", StaticFiles(directory="../frontend"), name="static")
+    app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 except Exception as e:
     logger.warning(f"Could not mount static files: {e}")
 
+def report_writer():
+    """Drain queued reports into the database every REPORT_BATCH_INTERVAL or REPORT_BATCH_SIZE items"""
+    while True:
+        batch = [report_queue.get()]
+        deadline = time.monotonic() + REPORT_BATCH_INTERVAL
+        while len(batch) < REPORT_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(report_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        try:
+            success = db_manager.insert_compliance_reports([report_data for report_data, _ in batch])
+        except Exception as e:
+            logger.error(f"Error writing report batch: {e}")
+            success = False
+        for _, future in batch:
+            future.set_result(success)
+
+def enqueue_report(report_data: Dict[str, Any]) -> Future:
+    """Queue a report for the batched writer, starting the writer thread on first use"""
+    global report_writer_thread
+    if report_writer_thread is None or not report_writer_thread.is_alive():
+        with report_writer_lock:
+            if report_writer_thread is None or not report_writer_thread.is_alive():
+                report_writer_thread = threading.Thread(target=report_writer, name="report-writer", daemon=True)
+                report_writer_thread.start()
+    future = Future()
+    report_queue.put((report_data, future))
+    return future
+
 # Pydantic models for data validation
 class ComplianceReport(BaseModel):
     device_id: str = Field(..., description="Unique device identifier")
@@ -139,88 +263,122 @@ class TokenPayload(BaseModel):
     permissions: List[str]
 
 # Authentication functions with enhanced security
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """Hash a password with strong settings"""
-    return pwd_context.hash(password)
-
-def check_rate_limit(username: str) -> bool:
+async def verify_password_in_pool(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in bcrypt_pool, replacing the pool if a worker died"""
+    global bcrypt_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(bcrypt_pool, verify_password, plain_password, hashed_password)
+    except BrokenProcessPool:
+        logger.error("bcrypt worker process died; recreating the pool")
+        broken, bcrypt_pool = bcrypt_pool, create_bcrypt_pool()
+        broken.shutdown(wait=False)
+        return await loop.run_in_executor(bcrypt_pool, verify_password, plain_password, hashed_password)
+
+def refill_login_tokens(tokens: float, last_refill: float, now: float) -> float:
+    """Top up a login bucket for the time elapsed since its last refill"""
+    return min(MAX_LOGIN_ATTEMPTS, tokens + (now - last_refill) * LOGIN_REFILL_RATE)
+
+async def check_rate_limit(username: str) -> bool:
     """Check if user is rate limited"""
-    now = datetime.utcnow()
-    if username in login_attempts:
-        attempts, last_attempt = login_attempts[username]
-        if now - last_attempt < timedelta(seconds=LOCKOUT_DURATION):
-            if attempts >= MAX_LOGIN_ATTEMPTS:
-                return False
-    return True
-
-def record_login_attempt(username: str, success: bool):
+    now = time.time()
+    if redis_client is not None:
+        tokens, last_refill = await redis_client.hmget(f"la:{username}", "tokens", "ts")
+        if tokens is None or last_refill is None:
+            return True
+        return refill_login_tokens(float(tokens), float(last_refill), now) >= 1
+    bucket = login_buckets.get(username)
+    return bucket is None or refill_login_tokens(*bucket, now) >= 1
+
+async def record_login_attempt(username: str, success: bool):
     """Record login attempt for rate limiting"""
-    now = datetime.utcnow()
-    if username in login_attempts:
-        attempts, last_attempt = login_attempts[username]
-        if now - last_attempt < timedelta(seconds=LOCKOUT_DURATION):
-            if success:
-                login_attempts[username] = (0, now)
-            else:
-                login_attempts[username] = (attempts + 1, now)
+    now = time.time()
+    if redis_client is not None:
+        key = f"la:{username}"
+        if success:
+            await redis_client.delete(key)
         else:
-            login_attempts[username] = (1 if not success else 0, now)
-    else:
-        login_attempts[username] = (1 if not success else 0, now)
-
-def authenticate_user(username: str, password: str) -> Optional[User]:
+            # An untouched bucket is full again after LOCKOUT_DURATION, so let it expire
+            await spend_login_token(
+                keys=[key],
+                args=[MAX_LOGIN_ATTEMPTS, LOGIN_REFILL_RATE, now, LOCKOUT_DURATION]
+            )
+        return
+    if success:
+        # A successful login refills the bucket; full buckets need no entry
+        login_buckets.pop(username, None)
+        return
+    bucket = login_buckets.pop(username, None)
+    # Buckets are kept in order of their last failed attempt, so the oldest
+    # has had the longest to refill: drop it once full, or when the store is
+    # at its cap (e.g. username spraying), so memory stays bounded without a scan
+    while login_buckets:
+        oldest = next(iter(login_buckets))
+        if len(login_buckets) < LOGIN_BUCKETS_MAX_SIZE and refill_login_tokens(*login_buckets[oldest], now) < MAX_LOGIN_ATTEMPTS:
+            break
+        del login_buckets[oldest]
+    tokens = refill_login_tokens(*bucket, now) if bucket else MAX_LOGIN_ATTEMPTS
+    # Re-inserted so dict order tracks the most recent attempt
+    login_buckets[username] = (max(0.0, tokens - 1), now)
+
+async def authenticate_user(username: str, password: str) -> Optional[User]:
     """Authenticate a user with rate limiting"""
     # Check rate limiting
-    if not check_rate_limit(username):
-        record_login_attempt(username, False)
+    if not await check_rate_limit(username):
+        await record_login_attempt(username, False)
         return None
     
     # Validate input
     if not username or not password:
-        record_login_attempt(username, False)
+        await record_login_attempt(username, False)
         return None
     
-    # Check credentials
-    if username == DEFAULT_ADMIN_USERNAME and verify_password(password, get_password_hash(DEFAULT_ADMIN_PASSWORD)):
-        record_login_attempt(username, True)
+    # Check credentials; always verify so unknown usernames take as long as known ones
+    password_ok = await verify_password_in_pool(password, ADMIN_PASSWORD_HASH)
+    if username == DEFAULT_ADMIN_USERNAME and password_ok:
+        await record_login_attempt(username, True)
         return User(username=username)
     
-    record_login_attempt(username, False)
+    await record_login_attempt(username, False)
     return None
 
-def create_token_pair(data: dict, expires_delta: timedelta = None, refresh_expires_delta: timedelta = None):
+def urlsafe_token(raw: bytes) -> str:
+    """Encode random bytes the same way secrets.token_urlsafe does"""
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def create_token_pair(data: dict, expires_delta: timedelta = None, refresh_expires_delta: timedelta = None, jti: str = None, now: int = None):
     """Create JWT access and refresh tokens with enhanced security"""
     to_encode = data.copy()
-    jti = secrets.token_urlsafe(32)  # Unique token ID
+    if jti is None:
+        jti = secrets.token_urlsafe(32)  # Unique token ID
+    # exp/iat are epoch seconds by spec, so work in ints from one clock read
+    if now is None:
+        now = int(time.time())
     
     # Access token
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
     access_token_data = {
         **to_encode,
         "exp": expire,
-        "iat": datetime.utcnow(),
+        "iat": now,
         "jti": jti,
         "type": "access"
     }
     
     # Refresh token
     if refresh_expires_delta:
-        refresh_expire = datetime.utcnow() + refresh_expires_delta
+        refresh_expire = now + int(refresh_expires_delta.total_seconds())
     else:
-        refresh_expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        refresh_expire = now + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
     
     refresh_token_data = {
         "sub": data.get("sub"),
         "exp": refresh_expire,
-        "iat": datetime.utcnow(),
+        "iat": now,
         "jti": jti,
         "type": "refresh"
     }
@@ -231,13 +389,84 @@ def create_token_pair(data: dict, expires_delta: timedelta = None, refresh_expir
     
     return access_token, refresh_token, jti
 
-def is_token_blacklisted(token: str) -> bool:
+def token_digest(token: str) -> bytes:
+    """Short fixed-size key for a token, so caches don't hold full JWTs"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+async def is_token_blacklisted(token: str) -> bool:
     """Check if token is blacklisted"""
-    return token in blacklisted_tokens
+    digest = token_digest(token)
+    if redis_client is not None:
+        return await redis_client.exists(f"bl:{digest.hex()}") > 0
+    expires_at = blacklisted_tokens.get(digest)
+    if expires_at is None:
+        return False
+    if expires_at <= time.time():
+        # Expired tokens are rejected by jwt.decode anyway
+        blacklisted_tokens.pop(digest, None)
+        return False
+    return True
 
-def blacklist_token(token: str):
-    """Add token to blacklist"""
-    blacklisted_tokens.add(token)
+async def blacklist_token(token: str):
+    """Add token to blacklist until it expires"""
+    now = time.time()
+    try:
+        expires_at = jwt.decode(token, options={"verify_signature": False})["exp"]
+    except (JWTError, KeyError):
+        expires_at = now + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    digest = token_digest(token)
+    token_cache.pop(digest, None)
+    if redis_client is not None:
+        ttl = int(expires_at - now) + 1
+        if ttl > 0:
+            await redis_client.setex(f"bl:{digest.hex()}", ttl, 1)
+        return
+    for revoked, revoked_expires_at in list(blacklisted_tokens.items()):
+        if revoked_expires_at <= now:
+            del blacklisted_tokens[revoked]
+    blacklisted_tokens[digest] = expires_at
+
+async def store_session(session_id: str, session: dict):
+    """Store a login session until its refresh token expires"""
+    if redis_client is None:
+        active_sessions[session_id] = session
+        user_sessions[session["username"]].add(session_id)
+        return
+    key = f"session:{session_id}"
+    user_key = f"user:{session['username']}:sessions"
+    ttl = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={field: str(value) for field, value in session.items()})
+        pipe.expire(key, ttl)
+        pipe.sadd(user_key, session_id)
+        pipe.expire(user_key, ttl)
+        await pipe.execute()
+
+async def delete_user_sessions(username: str):
+    """Remove every session belonging to username"""
+    if redis_client is None:
+        for session_id in user_sessions.pop(username, ()):
+            active_sessions.pop(session_id, None)
+        return
+    user_key = f"user:{username}:sessions"
+    session_ids = await redis_client.smembers(user_key)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for session_id in session_ids:
+            pipe.delete(f"session:{session_id}")
+        pipe.delete(user_key)
+        await pipe.execute()
+
+def cache_validated_token(digest: bytes, user: User, expires_at: int):
+    """Remember a validated token until it expires, for at most TOKEN_CACHE_TTL"""
+    now = time.time()
+    if len(token_cache) >= TOKEN_CACHE_MAX_SIZE:
+        for key, (cached_until, _) in list(token_cache.items()):
+            if cached_until <= now:
+                del token_cache[key]
+        if len(token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            # Still full of live entries; evict the oldest
+            token_cache.pop(next(iter(token_cache)), None)
+    token_cache[digest] = (min(now + TOKEN_CACHE_TTL, expires_at), user)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Get current authenticated user with enhanced security"""
@@ -247,6 +476,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Reuse a recent validation of the same token; the blacklist is still
+    # checked since another worker may have revoked it
+    digest = token_digest(credentials.credentials)
+    cached = token_cache.get(digest)
+    if cached is not None:
+        cached_until, user = cached
+        if cached_until > time.time() and not await is_token_blacklisted(credentials.credentials):
+            return user
+        token_cache.pop(digest, None)
+    
     try:
         # Decode token with explicit algorithm specification
         payload = jwt.decode(
@@ -265,7 +504,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             raise credentials_exception
         
         # Check if token is blacklisted
-        if is_token_blacklisted(credentials.credentials):
+        if await is_token_blacklisted(credentials.credentials):
             raise credentials_exception
         
         # Validate token type
@@ -281,7 +520,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         
         if not user.is_active:
             raise credentials_exception
-            
+        
+        cache_validated_token(digest, user, payload["exp"])
         return user
         
     except JWTError as e:
@@ -291,16 +531,49 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         logger.error(f"Token validation error: {e}")
         raise credentials_exception
 
+# Bodies of the constant endpoints, serialized once at import
+ROOT_BYTES = orjson.dumps({
+    "message": "Endpoint Compliance Monitor API",
+    "version": "1.0.0",
+    "docs": "/docs",
+    "login": "/login",
+    "dashboard": "/dashboard"
+})
+
+SECURITY_INFO_BYTES = orjson.dumps({
+    "token_expiry_minutes": ACCESS_TOKEN_EXPIRE_MINUTES,
+    "refresh_token_expiry_days": REFRESH_TOKEN_EXPIRE_DAYS,
+    "max_login_attempts": MAX_LOGIN_ATTEMPTS,
+    # A locked-out user regains one attempt every login_refill_seconds and
+    # all of them after lockout_duration_seconds
+    "lockout_duration_seconds": LOCKOUT_DURATION,
+    "login_refill_seconds": LOGIN_REFILL_INTERVAL,
+    "algorithm": ALGORITHM
+})
+
+AGENT_DOWNLOADS = {
+    "macos": {
+        "binary_name": "carboncompliance-agent-macos",
+        "download_url": "http://localhost:8000/downloads/carboncompliance-agent-macos",
+        "instructions": "chmod +x carboncompliance-agent-macos && ./carboncompliance-agent-macos --api-url=http://localhost:8000"
+    },
+    "linux": {
+        "binary_name": "carboncompliance-agent-linux", 
+        "download_url": "http://localhost:8000/downloads/carboncompliance-agent-linux",
+        "instructions": "chmod +x carboncompliance-agent-linux && ./carboncompliance-agent-linux --api-url=http://localhost:8000"
+    },
+    "windows": {
+        "binary_name": "carboncompliance-agent-windows.exe",
+        "download_url": "http://localhost:8000/downloads/carboncompliance-agent-windows.exe", 
+        "instructions": ".\\carboncompliance-agent-windows.exe --api-url=http://localhost:8000"
+    }
+}
+DOWNLOAD_BYTES = {os_type: orjson.dumps(info) for os_type, info in AGENT_DOWNLOADS.items()}
+
 @app.get("/", response_model=Dict[str, str])
 async def root():
     """Root endpoint - redirect to login"""
-    return {
-        "message": "Endpoint Compliance Monitor API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "login": "/login",
-        "dashboard": "/dashboard"
-    }
+    return Response(content=ROOT_BYTES, media_type="application/json")
 
 @app.post("/login", response_model=Token)
 async def login(user_credentials: UserLogin):
@@ -314,14 +587,14 @@ async def login(user_credentials: UserLogin):
             )
         
         # Check rate limiting
-        if not check_rate_limit(user_credentials.username):
+        if not await check_rate_limit(user_credentials.username):
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Too many login attempts. Try again in {LOCKOUT_DURATION} seconds"
+                detail=f"Too many login attempts. Try again in {LOGIN_REFILL_INTERVAL} seconds"
             )
         
         # Authenticate user
-        user = authenticate_user(user_credentials.username, user_credentials.password)
+        user = await authenticate_user(user_credentials.username, user_credentials.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -329,31 +602,28 @@ async def login(user_credentials: UserLogin):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Create secure token pair
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        refresh_token_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        
+        # Create secure token pair with the default lifetimes
+        now = int(time.time())
+        # One random draw supplies both the token ID and the session ID
+        raw = secrets.token_bytes(64)
         access_token, refresh_token, jti = create_token_pair(
             data={
                 "sub": user.username,
                 "roles": user.roles,
                 "permissions": user.permissions
             },
-            expires_delta=access_token_expires,
-            refresh_expires_delta=refresh_token_expires
+            jti=urlsafe_token(raw[:32]),
+            now=now
         )
         
         # Store session securely
-        session_id = secrets.token_urlsafe(32)
-        active_sessions[session_id] = {
+        session_id = urlsafe_token(raw[32:])
+        # Only what revocation needs; the tokens themselves are never read back
+        await store_session(session_id, {
             "username": user.username,
             "jti": jti,
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "created": datetime.utcnow(),
-            "access_expires": datetime.utcnow() + access_token_expires,
-            "refresh_expires": datetime.utcnow() + refresh_token_expires
-        }
+            "access_expires": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        })
         
         return {
             "access_token": access_token,
@@ -396,26 +666,23 @@ async def refresh_token(refresh_token_data: RefreshToken):
             )
         
         # Check if refresh token is blacklisted
-        if is_token_blacklisted(refresh_token_data.refresh_token):
+        if await is_token_blacklisted(refresh_token_data.refresh_token):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token has been revoked"
             )
         
-        # Create new token pair
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        # Create new token pair with the default lifetimes
         new_access_token, new_refresh_token, new_jti = create_token_pair(
             data={
                 "sub": username,
                 "roles": payload.get("roles", ["admin"]),
                 "permissions": payload.get("permissions", ["read", "write", "admin"])
-            },
-            expires_delta=access_token_expires,
-            refresh_expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+            }
         )
         
         # Blacklist old refresh token
-        blacklist_token(refresh_token_data.refresh_token)
+        await blacklist_token(refresh_token_data.refresh_token)
         
         return {
             "access_token": new_access_token,
@@ -442,12 +709,10 @@ async def logout(current_user: User = Depends(get_current_user), credentials: HT
     """Secure logout endpoint that blacklists tokens"""
     try:
         # Blacklist the current token
-        blacklist_token(credentials.credentials)
+        await blacklist_token(credentials.credentials)
         
         # Clean up session
-        for session_id, session_data in list(active_sessions.items()):
-            if session_data.get("username") == current_user.username:
-                del active_sessions[session_id]
+        await delete_user_sessions(current_user.username)
         
         return {"message": "Successfully logged out"}
     except Exception as e:
@@ -470,55 +735,31 @@ async def check_auth(current_user: User = Depends(get_current_user)):
 @app.get("/auth/security-info")
 async def get_security_info():
     """Get security information for the frontend"""
-    return {
-        "token_expiry_minutes": ACCESS_TOKEN_EXPIRE_MINUTES,
-        "refresh_token_expiry_days": REFRESH_TOKEN_EXPIRE_DAYS,
-        "max_login_attempts": MAX_LOGIN_ATTEMPTS,
-        "lockout_duration_seconds": LOCKOUT_DURATION,
-        "algorithm": ALGORITHM
-    }
+    return Response(content=SECURITY_INFO_BYTES, media_type="application/json")
 
 @app.get("/login")
 async def serve_login():
     """Serve the login page"""
-    try:
-        login_path = "../frontend/login.html"
-        if os.path.exists(login_path):
-            return FileResponse(login_path)
-        else:
-            raise HTTPException(status_code=404, detail="Login page not found")
-    except Exception as e:
-        logger.error(f"Error serving login page: {e}")
-        raise HTTPException(status_code=500, detail="Error serving login page")
+    if LOGIN_PAGE not in AVAILABLE_PAGES:
+        raise HTTPException(status_code=404, detail="Login page not found")
+    return FileResponse(LOGIN_PAGE)
 
 @app.get("/dashboard")
 async def serve_dashboard():
     """Serve the HTML dashboard"""
-    try:
-        dashboard_path = "../frontend/index.html"
-        if os.path.exists(dashboard_path):
-            return FileResponse(dashboard_path)
-        else:
-            raise HTTPException(status_code=404, detail="Dashboard not found")
-    except Exception as e:
-        logger.error(f"Error serving dashboard: {e}")
-        raise HTTPException(status_code=500, detail="Error serving dashboard")
+    if DASHBOARD_PAGE not in AVAILABLE_PAGES:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return FileResponse(DASHBOARD_PAGE)
 
 @app.get("/download-agent")
 async def serve_download_page():
     """Serve the agent download page"""
-    try:
-        download_path = "../frontend/download.html"
-        if os.path.exists(download_path):
-            return FileResponse(download_path)
-        else:
-            raise HTTPException(status_code=404, detail="Download page not found")
-    except Exception as e:
-        logger.error(f"Error serving download page: {e}")
-        raise HTTPException(status_code=500, detail="Error serving download page")
+    if DOWNLOAD_PAGE not in AVAILABLE_PAGES:
+        raise HTTPException(status_code=404, detail="Download page not found")
+    return FileResponse(DOWNLOAD_PAGE)
 
 @app.get("/health", response_model=HealthCheck)
-async def health_check():
+def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
@@ -535,24 +776,25 @@ async def health_check():
     )
 
 @app.post("/report", response_model=Dict[str, str])
-async def submit_compliance_report(report: ComplianceReport):
+def submit_compliance_report(report: ComplianceReport):
     """Submit a compliance report from an agent"""
     try:
-        # Validate and prepare report data
-        report_data = report.dict()
-        # Add timestamp if not provided
-        if 'timestamp' not in report_data:
-            report_data['timestamp'] = datetime.now().isoformat()
+        # The model is already validated; dump it once for the database layer
+        report_data = report.model_dump()
         # --- Compliance logic for imposed certificates ---
-        imposed = db_manager.get_imposed_certificates()
-        cert_results = {}
-        for cert_id in imposed:
-            cert_results[cert_id] = check_certificate(cert_id, report_data)
-        report_data['details'] = str(cert_results)
-        # Insert report into database
-        success = db_manager.insert_compliance_report(report_data)
+        # Run the precomputed probe set once, then apply each compiled certificate
+        probes, compiled = db_manager.get_certificate_plan()
+        probe_cache = run_probes(probes)
+        cert_results = {cert_id: evaluate(probe_cache) for cert_id, evaluate in compiled.items()}
+        report_data['details'] = json.dumps(cert_results, separators=(',', ':'))
+        # Queue report for the batched writer and wait for its transaction
+        try:
+            success = enqueue_report(report_data).result(timeout=REPORT_WRITE_TIMEOUT)
+        except FutureTimeoutError:
+            logger.error(f"Timed out storing compliance report for device {report.device_id}")
+            raise HTTPException(status_code=500, detail="Timed out storing compliance report")
         if success:
-            logger.info(f"Compliance report received for device {report.device_id}")
+            logger.debug("Compliance report received for device %s", report.device_id)
             return {
                 "status": "success",
                 "message": f"Compliance report submitted for device {report.device_id}",
@@ -560,12 +802,14 @@ async def submit_compliance_report(report: ComplianceReport):
             }
         else:
             raise HTTPException(status_code=500, detail="Failed to store compliance report")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing compliance report: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/summary", response_model=ComplianceSummary)
-async def get_compliance_summary():
+def get_compliance_summary():
     """Get overall compliance summary"""
     try:
         summary = db_manager.get_compliance_summary()
@@ -575,7 +819,7 @@ async def get_compliance_summary():
         raise HTTPException(status_code=500, detail="Failed to retrieve compliance summary")
 
 @app.get("/reports", response_model=List[Dict[str, Any]])
-async def get_recent_reports(limit: int = 50):
+def get_recent_reports(limit: int = 50):
     """Get recent compliance reports"""
     try:
         if limit > 100:  # Prevent excessive data retrieval
@@ -587,7 +831,7 @@ async def get_recent_reports(limit: int = 50):
         raise HTTPException(status_code=500, detail="Failed to retrieve reports")
 
 @app.get("/device/{device_id}", response_model=List[Dict[str, Any]])
-async def get_device_history(device_id: str):
+def get_device_history(device_id: str):
     """Get compliance history for a specific device"""
     try:
         history = db_manager.get_device_history(device_id)
@@ -601,25 +845,17 @@ async def get_device_history(device_id: str):
         raise HTTPException(status_code=500, detail="Failed to retrieve device history")
 
 @app.get("/devices", response_model=List[Dict[str, Any]])
-async def get_all_devices():
+def get_all_devices():
     """Get list of all devices"""
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT device_id, hostname, first_seen, last_seen, total_reports
-                FROM devices 
-                ORDER BY last_seen DESC
-            """)
-            devices = [dict(row) for row in cursor.fetchall()]
-            return devices
+        return db_manager.get_all_devices()
     except Exception as e:
         logger.error(f"Error getting devices: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve devices")
 
 # New endpoints for the dashboard
 @app.get("/api/compliance/summary")
-async def get_compliance_summary_api():
+def get_compliance_summary_api():
     """Get compliance summary for dashboard"""
     try:
         summary = db_manager.get_compliance_summary()
@@ -640,7 +876,7 @@ async def get_compliance_summary_api():
         }
 
 @app.get("/api/compliance/reports")
-async def get_compliance_reports_api(limit: int = 10):
+def get_compliance_reports_api(limit: int = 10):
     """Get recent compliance reports for dashboard"""
     try:
         reports = db_manager.get_recent_reports(limit)
@@ -656,7 +892,7 @@ async def add_endpoint(endpoint: EndpointData):
         # For now, we'll just return success since we don't have an endpoints table
         # In a real implementation, you'd save this to a database
         logger.info(f"Adding endpoint: {endpoint.name} ({endpoint.hostname})")
-        return {"message": "Endpoint added successfully", "endpoint": endpoint.dict()}
+        return {"message": "Endpoint added successfully", "endpoint": endpoint.model_dump()}
     except Exception as e:
         logger.error(f"Error adding endpoint: {e}")
         raise HTTPException(status_code=500, detail="Error adding endpoint")
@@ -669,9 +905,12 @@ async def register_device(device: DeviceRegistration):
         if device.compliance_metrics:
             compliance_score = device.compliance_metrics.get('compliance_score', 0)
             is_compliant = device.compliance_metrics.get('is_compliant', False)
-            logger.info(f"Registered device: {device.device_id} ({device.hostname}) - {device.platform} {device.platform_version} - Compliance Score: {compliance_score:.1f}% - Compliant: {is_compliant}")
+            logger.info("Registered device: %s (%s) - %s %s - Compliance Score: %.1f%% - Compliant: %s",
+                        device.device_id, device.hostname, device.platform, device.platform_version,
+                        compliance_score, is_compliant)
         else:
-            logger.info(f"Registered device: {device.device_id} ({device.hostname}) - {device.platform} {device.platform_version}")
+            logger.info("Registered device: %s (%s) - %s %s",
+                        device.device_id, device.hostname, device.platform, device.platform_version)
         
         # In a real implementation, this would save to a database
         # For now, we'll just return success
@@ -686,66 +925,37 @@ async def register_device(device: DeviceRegistration):
         logger.error(f"Error registering device: {e}")
         raise HTTPException(status_code=500, detail="Failed to register device")
 
-# In-memory storage for imposed certificates (in production, use database)
-imposed_certificates = set()
-
+# Imposed certificates live in the database so every worker process sees them
 @app.get("/api/certificates")
-async def get_imposed_certificates():
+def get_imposed_certificates():
     """Get all currently imposed compliance certificates"""
     try:
-        return {"imposed": list(imposed_certificates)}
+        return {"imposed": db_manager.get_imposed_certificates()}
     except Exception as e:
         logger.error(f"Error fetching imposed certificates: {e}")
         raise HTTPException(status_code=500, detail="Error fetching imposed certificates")
 
 @app.post("/api/certificates/{cert_id}")
-async def impose_certificate(cert_id: str):
+def impose_certificate(cert_id: str):
     """Impose a compliance certificate by ID"""
-    try:
-        imposed_certificates.add(cert_id)
-        logger.info(f"Certificate {cert_id} imposed successfully")
-        return {"status": "success", "cert_id": cert_id, "action": "imposed"}
-    except Exception as e:
-        logger.error(f"Error imposing certificate: {e}")
+    if not db_manager.impose_certificate(cert_id):
         raise HTTPException(status_code=500, detail="Error imposing certificate")
+    logger.info(f"Certificate {cert_id} imposed successfully")
+    return {"status": "success", "cert_id": cert_id, "action": "imposed"}
 
 @app.delete("/api/certificates/{cert_id}")
-async def unimpose_certificate(cert_id: str):
+def unimpose_certificate(cert_id: str):
     """Unimpose a compliance certificate by ID"""
-    try:
-        imposed_certificates.discard(cert_id)
-        logger.info(f"Certificate {cert_id} unimposed successfully")
-        return {"status": "success", "cert_id": cert_id, "action": "unimposed"}
-    except Exception as e:
-        logger.error(f"Error unimpressing certificate: {e}")
-        raise HTTPException(status_code=500, detail="Error unimpressing certificate")
+    if not db_manager.unimpose_certificate(cert_id):
+        raise HTTPException(status_code=500, detail="Error unimposing certificate")
+    logger.info(f"Certificate {cert_id} unimposed successfully")
+    return {"status": "success", "cert_id": cert_id, "action": "unimposed"}
 
 @app.get("/api/download/{os_type}")
 async def get_download_info(os_type: str):
     """Get download information for agent binaries"""
-    download_info = {
-        "macos": {
-            "binary_name": "carboncompliance-agent-macos",
-            "download_url": "http://localhost:8000/downloads/carboncompliance-agent-macos",
-            "instructions": "chmod +x carboncompliance-agent-macos && ./carboncompliance-agent-macos --api-url=http://localhost:8000"
-        },
-        "linux": {
-            "binary_name": "carboncompliance-agent-linux", 
-            "download_url": "http://localhost:8000/downloads/carboncompliance-agent-linux",
-            "instructions": "chmod +x carboncompliance-agent-linux && ./carboncompliance-agent-linux --api-url=http://localhost:8000"
-        },
-        "windows": {
-            "binary_name": "carboncompliance-agent-windows.exe",
-            "download_url": "http://localhost:8000/downloads/carboncompliance-agent-windows.exe", 
-            "instructions": ".\\carboncompliance-agent-windows.exe --api-url=http://localhost:8000"
-        }
-    }
-    
-    if os_type not in download_info:
+    body = DOWNLOAD_BYTES.get(os_type)
+    if body is None:
         raise HTTPException(status_code=400, detail="Unsupported OS type")
     
-    return download_info[os_type]
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    return Response(content=body, media_type="application/json")
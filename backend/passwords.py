@@ -0,0 +1,21 @@
+from passlib.context import CryptContext
+
+# Kept free of app imports: the bcrypt worker processes import this module
+# to unpickle verify_password, and should not load the whole API with it.
+# Spawned children also re-run the parent's __main__ script, which is why the
+# server must be started through serve.py rather than main.py.
+
+# Password hashing with stronger settings
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=12  # Increased rounds for better security
+)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+    """Hash a password with strong settings"""
+    return pwd_context.hash(password)
@@ -0,0 +1,45 @@
+import logging
+import os
+import secrets
+
+# Launcher for the API. Kept free of app imports: uvicorn imports main:app
+# itself, and spawned worker processes re-run this script as __mp_main__, so
+# anything done at module level here would be repeated in every child.
+
+logger = logging.getLogger(__name__)
+
+def configured_workers() -> int:
+    """Number of uvicorn worker processes to run.
+
+    WEB_CONCURRENCY overrides, as with the uvicorn CLI. Without Redis the auth
+    state is per-process, so only a single worker is safe: logout would only
+    revoke tokens in one worker and the login rate limit would be multiplied
+    by the worker count.
+    """
+    redis_url = os.environ.get("REDIS_URL")
+    workers = int(os.environ.get("WEB_CONCURRENCY") or (os.cpu_count() if redis_url else 1))
+    if workers > 1 and not redis_url:
+        logger.warning(f"{workers} workers requested without REDIS_URL; auth state is per-process, running a single worker")
+        return 1
+    return workers
+
+def main():
+    import uvicorn
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
+    # Workers are separate processes, so they must agree on the token signing key
+    os.environ.setdefault("SECRET_KEY", secrets.token_urlsafe(64))
+    workers = configured_workers()
+    # Workers size their bcrypt pools from this
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        log_level="warning"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@
 # CarbonCompliance Production Deployment Script
 echo "🚀 Deploying CarbonCompliance Production System..."
 
+# Dashboard origins the API accepts cross-origin requests from
+SERVER_IP=$(hostname -I | awk '{print $1}')
+DASHBOARD_ORIGIN=${DASHBOARD_ORIGIN:-http://localhost,http://127.0.0.1,http://$SERVER_IP}
+
 # Pull latest images
 echo "📥 Pulling latest Docker images..."
 docker pull saadhaniftaj/carboncompliance-backend:latest
@@ -25,6 +29,7 @@ docker run -d \
   --network carboncompliance-network \
   -p 8000:8000 \
   -v carboncompliance-data:/app/data \
+  -e DASHBOARD_ORIGIN=$DASHBOARD_ORIGIN \
   --restart unless-stopped \
   saadhaniftaj/carboncompliance-backend:latest
 
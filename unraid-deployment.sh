@@ -26,6 +26,7 @@ docker run -d \
   --network carboncompliance-network \
   -p 8000:8000 \
   -v carboncompliance-data:/app/data \
+  -e DASHBOARD_ORIGIN=http://$SERVER_IP \
   --restart unless-stopped \
   saadhaniftaj/carboncompliance-backend:latest
 